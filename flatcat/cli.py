@@ -12,8 +12,10 @@ def write_example_config(dest: Path):
     root = "."
     output = "flatcat.md"
     include_tree = true
+    show_ignored_tree = false   # also list the contents of ignored directories
     tree_depth = 0
     respect_gitignore = true
+    parallel_scan = false       # list directories ahead on threads (helps on network drives)
     ignore_extensions = [
     # Images
     ".png", ".jpg", ".jpeg", ".gif", ".bmp", ".ico", ".svg", ".webp", ".avif",
@@ -181,7 +183,7 @@ def main(argv=None):
             print(f"Output file: {cfg.output}")
             print(f"Exclude patterns: {cfg.filters.exclude}")
             print(f"Include patterns: {cfg.filters.include}")
-            print(f"Ignore extensions: {cfg.ignore_extensions}")
+            print(f"Ignore extensions: {sorted(cfg.ignore_extensions)}")
         
         if args.dry_run:
             print("DRY RUN - No output file will be written.")
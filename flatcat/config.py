@@ -1,7 +1,7 @@
 from __future__ import annotations
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Optional
+from typing import FrozenSet, List, Optional
 
 import sys
 
@@ -67,10 +67,13 @@ class Config:
     root: Path = Path(".")
     output: Path = Path("flatcat.md")
     include_tree: bool = True
+    show_ignored_tree: bool = False
     tree_depth: int = 0
     respect_gitignore: bool = True
-    ignore_extensions: List[str] = field(
-        default_factory=lambda: [
+    parallel_scan: bool = False
+    cache_file: Optional[Path] = None
+    ignore_extensions: FrozenSet[str] = field(
+        default_factory=lambda: frozenset([
             # Images
             ".png", ".jpg", ".jpeg", ".gif", ".bmp", ".ico", ".svg", ".webp", ".avif",
             # Videos  
@@ -89,11 +92,15 @@ class Config:
             ".bin", ".dat", ".db", ".sqlite", ".sqlite3", ".pem", ".key", ".crt", ".p12",
             # Compiled/generated files
             ".pyc", ".pyo", ".class", ".o", ".obj", ".lib", ".a"
-        ]
+        ])
     )
     filters: Filters = field(default_factory=Filters)
     format: FormatOptions = field(default_factory=FormatOptions)
 
+    def __post_init__(self):
+        # Extensions are matched case-insensitively with O(1) lookups
+        self.ignore_extensions = frozenset(ext.lower() for ext in self.ignore_extensions)
+
     @classmethod
     def load(cls, path: Optional[Path]) -> "Config":
         if tomllib is None:
@@ -135,15 +142,18 @@ class Config:
             root=Path(d.get("root", defaults.root)),
             output=Path(d.get("output", defaults.output)),
             include_tree=d.get("include_tree", defaults.include_tree),
+            show_ignored_tree=d.get("show_ignored_tree", defaults.show_ignored_tree),
             tree_depth=d.get("tree_depth", defaults.tree_depth),
             respect_gitignore=d.get("respect_gitignore", defaults.respect_gitignore),
+            parallel_scan=d.get("parallel_scan", defaults.parallel_scan),
+            cache_file=Path(d["cache_file"]) if d.get("cache_file") else defaults.cache_file,
             ignore_extensions=d.get("ignore_extensions", defaults.ignore_extensions),
             filters=Filters(
                 include=get_nested(["filters", "include"], defaults.filters.include),
                 exclude=get_nested(["filters", "exclude"], defaults.filters.exclude),
             ),
             format=FormatOptions(
-                heading=_coerce_str(heading_val< defaults.format.heading),
+                heading=_coerce_str(heading_val, defaults.format.heading),
                 fence_language_from_extension=bool(
                     get_nested(["format", "fence_language_from_extension"],
                                defaults.format.fence_language_from_extension)
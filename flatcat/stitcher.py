@@ -1,8 +1,16 @@
 from __future__ import annotations
+import codecs
+import functools
+import json
+import os
+import re
+from collections import deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, TypeVar, Union
 
 from .config import Config
+from .tree import scan_dir
 
 try:
     import pathspec
@@ -10,59 +18,349 @@ except Exception:
     pathspec = None
 
 
-def is_text_file(path: Path) -> bool:
+MAX_FILE_SIZE = 10 * 1024 * 1024  # Files above this are never considered text
+MAX_CONTENT_BYTES = 150000  # Longer files are truncated in the output
+SNIFF_BYTES = 4096  # Leading bytes inspected to tell text from binary
+
+# Extensions that are always binary; skipped by name alone, whatever ignore_extensions says
+BINARY_EXTENSIONS = frozenset({
+    "png", "jpg", "jpeg", "gif", "webp", "ico", "pdf",
+    "zip", "tar", "gz", "xz", "bz2", "7z", "jar",
+    "exe", "dll", "so", "dylib", "o", "a", "class", "pyc", "pyo",
+    "woff", "woff2", "ttf", "otf", "mp3", "mp4", "mkv", "mov", "wav", "bin",
+})
+
+# (directory prefix relative to the root, verdict function) for each .gitignore
+# in scope, outermost first; see _compile_gitignore
+_GitignoreChain = Tuple[Tuple[str, Callable[[str], Optional[bool]]], ...]
+
+_NAMED_GROUP = re.compile(r"\(\?P<\w+>")
+
+R = TypeVar("R")
+
+
+def _try_utf8(chunk: Union[bytes, memoryview]) -> bool:
     """
-    Check if a file is likely text.
+    Check that a sample decodes as UTF-8; a multi-byte character cut off at the end is fine.
     """
     try:
-        # Skip very large files (>10MB) early
-        if path.stat().st_size > 10 * 1024 * 1024:  # 10MB limit
-            return False
-        
-        # An empty file is considered text
-        if path.stat().st_size == 0:
-            return True
-        
-        with path.open("rb") as f:
-            # Read a small chunk to check for null bytes (indicates binary)
-            chunk = f.read(1024)
-            if b'\0' in chunk:
-                return False
-    except (OSError, PermissionError):
-        return False
-    
-    # If it looks like text, try decoding a small sample
-    try:
-        path.open("r", encoding="utf-8").read(1024)
+        codecs.getincrementaldecoder("utf-8")().decode(chunk)
         return True
     except UnicodeDecodeError:
         return False
+
+
+def _read_body(path: str) -> Tuple[Optional[bytes], bool]:
+    """
+    Read a file's UTF-8 bytes for output.
+
+    Returns ``(body, False)``; ``(None, True)`` if the file is binary; or
+    ``(None, False)`` if it could not be opened or read.
+
+    The file is opened once with a raw descriptor (no buffered file object, no
+    extra fstat). The text sniff runs on the first block, so a binary file is
+    never read past it. Files over MAX_FILE_SIZE are expected to be filtered
+    out by the caller.
+    """
+    limit = MAX_CONTENT_BYTES + 1
+    try:
+        fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
     except (OSError, PermissionError):
-        return False
+        return None, False
+    try:
+        raw = os.read(fd, min(limit, 1 << 16))
+
+        # Null bytes or invalid UTF-8 near the start indicate a binary file.
+        # Neither check copies the sample.
+        if raw.find(b'\0', 0, SNIFF_BYTES) != -1 or not _try_utf8(memoryview(raw)[:SNIFF_BYTES]):
+            return None, True
+
+        # A short first read means a regular file is already at EOF; saves a read call
+        if len(raw) == 1 << 16:
+            blocks = [raw]
+            size = len(raw)
+            while size < limit:
+                block = os.read(fd, limit - size)
+                if not block:
+                    break
+                blocks.append(block)
+                size += len(block)
+            raw = b"".join(blocks)
+    except (OSError, PermissionError):
+        return None, False
+    finally:
+        os.close(fd)
+
+    truncated = len(raw) > MAX_CONTENT_BYTES
+    if truncated:
+        raw = raw[:MAX_CONTENT_BYTES]
+    # Valid UTF-8 is written as is; otherwise drop the undecodable bytes
+    try:
+        raw.decode("utf-8")
+    except UnicodeDecodeError:
+        raw = raw.decode("utf-8", errors="ignore").encode("utf-8")
+    if truncated:
+        raw += b"\n\n... (file truncated)"
+    return raw, False
+
+
+_WHITESPACE = b" \t\n\r\x0b\x0c"
+
+
+def _strip_view(body: bytes) -> memoryview:
+    """
+    Return ``body.strip()`` as a view, without copying the body.
+
+    Only the (usually few) whitespace bytes at either end are scanned.
+    """
+    start, end = 0, len(body)
+    while end > start and body[end - 1] in _WHITESPACE:
+        end -= 1
+    while start < end and body[start] in _WHITESPACE:
+        start += 1
+    return memoryview(body)[start:end]
+
 
+def _heading_template(heading: str) -> Optional[Tuple[bytes, bytes]]:
+    """
+    Pre-encode a heading format as (prefix, suffix) around its ``{path}`` field.
 
-def lang_from_suffix(path: Path) -> str:
-    return path.suffix[1:] or "text"
+    Returns None when the format has any other field or brace escape; those
+    still go through ``str.format`` per file.
+    """
+    prefix, field, suffix = heading.partition("{path}")
+    if not field or any(c in prefix + suffix for c in "{}"):
+        return None
+    return prefix.encode("utf-8"), (suffix + "\n").encode("utf-8")
 
 
-def get_gitignore_spec(root: Path) -> Optional[pathspec.PathSpec]:
+def _map_ahead(pool: Executor, fn: Callable[..., R], *iterables: Iterable, window: int) -> Iterator[R]:
     """
-    Load and parse .gitignore files, returning a PathSpec object
+    Like ``pool.map``, but with at most ``window`` calls in flight.
+
+    Results are yielded in order while the next ones are already being
+    computed. ``map`` submits everything up front, so results the consumer
+    has not reached yet pile up in memory; here they are capped at ``window``.
+    """
+    pending = deque()
+    for args in zip(*iterables):
+        if len(pending) >= window:
+            yield pending.popleft().result()
+        pending.append(pool.submit(fn, *args))
+    while pending:
+        yield pending.popleft().result()
+
+
+def _suffix(name: str) -> str:
+    """
+    Return the bare extension of a file name, following ``PurePath.suffix`` rules.
+    """
+    i = name.rfind(".")
+    return name[i + 1:] if 0 < i < len(name) - 1 else ""
+
+
+# Fence languages for extensions that differ from the highlighter's name
+_SUFFIX_LANG = {
+    "py": "python", "pyi": "python", "rs": "rust", "ts": "typescript", "js": "javascript",
+    "mjs": "javascript", "cjs": "javascript", "md": "markdown", "rb": "ruby", "kt": "kotlin",
+    "sh": "bash", "yml": "yaml", "h": "c", "hpp": "cpp", "cc": "cpp", "cs": "csharp",
+    "fs": "fsharp", "hs": "haskell", "ex": "elixir", "exs": "elixir", "pl": "perl",
+    "ps1": "powershell", "txt": "text",
+}
+
+
+@functools.lru_cache(maxsize=256)
+def lang_from_suffix(suffix: str) -> str:
+    return _SUFFIX_LANG.get(suffix.lower(), suffix or "text")
+
+
+@functools.lru_cache(maxsize=256)
+def _fence_open(suffix: str) -> bytes:
+    return f"```{lang_from_suffix(suffix)}\n".encode("utf-8", errors="replace")
+
+
+# Patterns that are a literal name ("Thumbs.db") or "*" plus a literal tail ("*.log").
+# gitwildmatch strips trailing whitespace, so patterns ending in it are left to pathspec.
+_EXACT_PATTERN = re.compile(r"^[^*?\[\]/\\!#]+(?<!\s)\Z")
+_SUFFIX_PATTERN = re.compile(r"^\*[^*?\[\]/\\]+(?<!\s)\Z")
+
+
+# Patterns naming a literal directory: "X/", "X/**", "**/X/**", "/a/b/", ...
+_DIR_PATTERN = re.compile(r"^(\*\*/)?(/)?([^*?\[\]/\\!#]+(?:/[^*?\[\]/\\!#]+)*)/(\*\*)?$")
+
+
+def _partition_patterns(patterns: List[str]) -> Tuple[Set[str], Tuple[str, ...], Set[str], Set[str],
+                                                       List[str], List[str]]:
+    """
+    Partition gitwildmatch exclude patterns by the cheapest way to match them.
+
+    Returns, in order:
+
+    - exact names ("Thumbs.db"), a set lookup on the entry name;
+    - name suffixes ("*.log"), a single ``str.endswith`` call;
+    - directory names ("X/", "**/X/**"), a set lookup on a directory's name,
+      at any depth;
+    - root-relative directories ("X/**", "/X/", "a/b/"), a set lookup on a
+      directory's relative path;
+    - other patterns without a slash, matched against the entry name alone,
+      since anything deeper is pruned together with the matching directory;
+    - path patterns, matched against the relative path.
+
+    Negations depend on pattern order, so a list containing any is returned
+    entirely as path patterns.
+    """
+    if any(pat.startswith("!") for pat in patterns):
+        return set(), (), set(), set(), [], list(patterns)
+    exact: Set[str] = set()
+    suffixes: List[str] = []
+    dir_names: Set[str] = set()
+    root_dirs: Set[str] = set()
+    name_patterns: List[str] = []
+    path_patterns: List[str] = []
+    for pat in patterns:
+        if _EXACT_PATTERN.match(pat):
+            exact.add(pat)
+            continue
+        if _SUFFIX_PATTERN.match(pat):
+            suffixes.append(pat[1:])
+            continue
+        m = _DIR_PATTERN.match(pat)
+        if m is not None:
+            anywhere, anchored, path, contents = m.groups()
+            if not anywhere and (anchored or contents or "/" in path):
+                root_dirs.add(path)
+                continue
+            if not anchored and "/" not in path:
+                dir_names.add(path)
+                continue
+        if "/" in pat:
+            path_patterns.append(pat)
+        else:
+            name_patterns.append(pat)
+    return exact, tuple(suffixes), dir_names, root_dirs, name_patterns, path_patterns
+
+
+_GLOB_CHARS = re.compile(r"[*?\[\\]")
+
+
+def _include_prefixes(patterns: List[str]) -> Tuple[str, ...]:
+    """
+    Return the literal leading directories of include patterns.
+
+    Only directories on the way to, or below, one of these prefixes can hold
+    included files, so the walk prunes all others. An empty prefix means a
+    pattern can match at any depth ("*.py", "**/docs"), so nothing is pruned.
+    """
+    prefixes: List[str] = []
+    for pat in patterns:
+        body = pat.rstrip("/")
+        if pat.startswith("!") or "/" not in body:
+            prefixes.append("")
+            continue
+        literal: List[str] = []
+        for part in body.lstrip("/").split("/")[:-1]:
+            if _GLOB_CHARS.search(part):
+                break
+            literal.append(part)
+        prefixes.append("/".join(literal))
+    return tuple(prefixes)
+
+
+def _compile_matcher(spec: pathspec.PathSpec) -> Callable[[str], bool]:
+    """
+    Fold a PathSpec into one alternation regex and return its matcher.
+
+    A single ``re`` scan replaces one regex call per pattern. Negated patterns
+    depend on order, so a spec containing any keeps using ``spec.match_file``.
+    Paths must already be relative POSIX paths.
+    """
+    patterns = [pat for pat in spec.patterns if pat.include is not None]
+    if not patterns:
+        return lambda path: False
+    if any(not pat.include for pat in patterns):
+        return spec.match_file
+    # Group names repeat across patterns, so make every group non-capturing
+    union = "|".join(f"(?:{_NAMED_GROUP.sub('(?:', pat.regex.pattern)})" for pat in patterns)
+    match = re.compile(union).match
+    return lambda path: match(path) is not None
+
+
+def _compile_gitignore(spec: pathspec.PathSpec) -> Callable[[str], Optional[bool]]:
+    """
+    Return a function giving a .gitignore's verdict on a path: True if ignored,
+    False if re-included by a "!" pattern, None if no pattern matches.
+
+    Without negations a match can only mean "ignored", so the folded regex of
+    _compile_matcher answers; otherwise pathspec finds the deciding pattern.
+    """
+    if any(pat.include is False for pat in spec.patterns):
+        return lambda path: spec.check_file(path).include
+    match = _compile_matcher(spec)
+    return lambda path: True if match(path) else None
+
+
+def _is_gitignored(gitignores: _GitignoreChain, path: str) -> bool:
+    """
+    Check a relative POSIX path against the .gitignore files in scope.
+
+    As in git, the deepest .gitignore with a verdict wins, so a nested file can
+    re-include ("!name") what a parent file ignores.
+    """
+    for rel_dir, verdict_of in reversed(gitignores):
+        verdict = verdict_of(path[len(rel_dir):])
+        if verdict is not None:
+            return verdict
+    return False
+
+
+def get_gitignore_spec(directory: Union[str, Path]) -> Optional[pathspec.PathSpec]:
+    """
+    Load and parse the .gitignore file of a directory, returning a GitIgnoreSpec object
+
+    GitIgnoreSpec follows git's own precedence rules (e.g. re-including a file
+    with "!" after excluding its name), which plain gitwildmatch does not.
     """
     if pathspec is None:
         return None
     
-    gitignore_file = root / ".gitignore"
-    if not gitignore_file.exists():
+    gitignore_file = os.path.join(directory, ".gitignore")
+    if not os.path.isfile(gitignore_file):
         return None
     
     try:
-        with gitignore_file.open("r", encoding="utf-8") as f:
-            return pathspec.PathSpec.from_lines("gitwildmatch", f)
+        with open(gitignore_file, "r", encoding="utf-8") as f:
+            return pathspec.GitIgnoreSpec.from_lines(f)
     except Exception:
         return None
     
     
+def _load_skip_cache(path: Path) -> Dict[str, Tuple[int, int]]:
+    """
+    Load the skipped-file cache: relative path -> (mtime_ns, size) of files found binary.
+
+    A missing or malformed cache is treated as empty.
+    """
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+        return {rel: (int(mtime_ns), int(size)) for rel, (mtime_ns, size) in data["skipped"].items()}
+    except Exception:
+        return {}
+
+
+def _save_skip_cache(path: Path, skipped: Dict[str, Tuple[int, int]]) -> None:
+    """
+    Write the skipped-file cache atomically (temporary file, then rename).
+    """
+    tmp = path.with_name(path.name + ".tmp")
+    try:
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump({"version": 1, "skipped": skipped}, f, separators=(",", ":"))
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
 def write_markdown(cfg: Config) -> None:
     if pathspec is None:
         raise ImportError("Please install 'pathspec' for full functionality: pip install pathspec")
@@ -70,97 +368,246 @@ def write_markdown(cfg: Config) -> None:
     cfg.root = cfg.root.resolve()
     cfg.output = cfg.output.resolve()
 
+    # Optional cache of files found binary on earlier runs; an unchanged
+    # (mtime, size) means they are skipped without being opened. Files that
+    # could not be read are not cached, as the error may not happen again.
+    cache_path = cfg.cache_file.resolve() if cfg.cache_file else None
+    cache_path_str = str(cache_path) if cache_path else None
+    known_skipped = _load_skip_cache(cache_path) if cache_path else {}
+    skipped: Dict[str, Tuple[int, int]] = {}
+    file_stats: Dict[str, Tuple[int, int]] = {}
+
     # Pathspec compilation
     # Compile include/exclude patterns from the config for efficient matching.
     include_spec = pathspec.PathSpec.from_lines("gitwildmatch", cfg.filters.include)
-    exclude_spec = pathspec.PathSpec.from_lines("gitwildmatch", cfg.filters.exclude)
-    gitignore_spec = get_gitignore_spec(cfg.root) if cfg.respect_gitignore else None
+    (exclude_exact, exclude_suffixes, exclude_dir_names, exclude_root_dirs,
+     exclude_names, exclude_paths) = _partition_patterns(cfg.filters.exclude)
+    exclude_name_spec = pathspec.PathSpec.from_lines("gitwildmatch", exclude_names)
+    exclude_spec = pathspec.PathSpec.from_lines("gitwildmatch", exclude_paths)
+    match_exclude_name = _compile_matcher(exclude_name_spec)
+
+    # Directories are not matched against includes (a directory rarely matches
+    # "*.py" itself); they are only pruned when no include can match below them.
+    include_prefixes = _include_prefixes(cfg.filters.include)
+    prune_by_include = bool(include_prefixes) and "" not in include_prefixes
 
-    files_to_render: List[Path] = []
+    def may_hold_includes(rel_dir: str) -> bool:
+        return any(rel_dir == p or rel_dir.startswith(p + "/") or p.startswith(rel_dir + "/")
+                   for p in include_prefixes)
+
+    root_str = str(cfg.root)
+    # Every scanned path starts with this prefix; slicing it off gives the relative
+    # path. os.path.join adds the separator unless the root already ends with one.
+    root_prefix = os.path.join(root_str, "")
+    # Config keeps lowercase ".ext" entries; strip the dots once so the hot loop
+    # can look up the bare suffix directly. Known binaries are always skipped.
+    ignore_exts = frozenset(ext.lstrip(".") for ext in cfg.ignore_extensions) | BINARY_EXTENSIONS
+
+    # Names repeat a lot across a tree (__pycache__, index.js, ...), so cache them.
+    @functools.lru_cache(maxsize=8192)
+    def is_excluded_name(name: str) -> bool:
+        return match_exclude_name(name)
+
+    files_to_render: List[Tuple[str, str, str]] = []  # (relative POSIX path, full path, suffix)
     tree_lines: List[str] = [str(cfg.root)]
 
-    # Single Recursive Directory Walk
-    # This function walks the tree once, collecting files and building the tree string.
-    def walk(dir_path: Path, depth: int, prefix_stack: List[str]):
-        if cfg.tree_depth > 0 and depth >= cfg.tree_depth:
+    # Single Directory Walk
+    # The tree is walked once, collecting files and building the tree string.
+    # os.scandir gives us the entry type from the directory listing itself, so no
+    # extra stat calls are needed; paths stay plain strings until a file is kept.
+    # The walk is iterative: each stack item is an entry still to be visited,
+    # together with its tree prefix, the depth of its directory, and whether it
+    # sits below an ignored directory (only walked when show_ignored_tree is set).
+    # Every .gitignore is read once, when its directory is entered, and applies to
+    # everything below it: items carry (directory prefix, verdict) pairs for all
+    # .gitignore files between the root and the entry, the deepest deciding.
+    stack: List[Tuple[os.DirEntry, bool, str, int, bool, _GitignoreChain]] = []
+
+    # With parallel_scan, directory listings are prefetched on the thread pool
+    # that later reads the files. When a directory is listed, its subdirectories
+    # are queued for listing, so their entries are usually ready by the time the
+    # walk enters them. The queue is LIFO: the walk is depth-first, so the
+    # directories it enters next are the ones queued last. The walk never waits
+    # for a listing that has not started yet; it cancels it and lists the
+    # directory itself. This pays off when listing a directory waits on I/O
+    # (network drives, cold caches); on a warm local tree the thread handoffs
+    # cost more than they save.
+    workers = min(32, (os.cpu_count() or 1) * 4)
+    pool = ThreadPoolExecutor(max_workers=workers)
+    scan_queue: List[Tuple[str, Future]] = []
+    listings: Dict[str, Future] = {}
+
+    def scan_next() -> None:
+        # One call per queued directory; list.append/pop are atomic
+        dir_path, future = scan_queue.pop()
+        if not future.set_running_or_notify_cancel():
             return
-        
         try:
-            # Sort entries to ensure consistent order. Directories come first.
-            entries = sorted(dir_path.iterdir(), key=lambda p: (p.is_file(), p.name.lower()))
-        except (OSError, PermissionError):
+            future.set_result(scan_dir(dir_path))
+        except Exception as exc:
+            future.set_exception(exc)
+
+    def prefetch(dir_path: str) -> None:
+        future: Future = Future()
+        listings[dir_path] = future
+        scan_queue.append((dir_path, future))
+        pool.submit(scan_next)
+
+    def drop_prefetch(dir_path: str) -> None:
+        future = listings.pop(dir_path, None)
+        if future is not None:
+            future.cancel()
+
+    # Bind everything the loop touches per entry to locals up front
+    tree_depth = cfg.tree_depth
+    respect_gitignore = cfg.respect_gitignore
+    parallel_scan = cfg.parallel_scan
+    include_tree = cfg.include_tree
+    walk_ignored = cfg.include_tree and cfg.show_ignored_tree
+    has_include = bool(cfg.filters.include)
+    match_include = _compile_matcher(include_spec)
+    match_exclude = _compile_matcher(exclude_spec)
+    rel_start = len(root_prefix)
+    native_sep = os.sep if os.sep != "/" else None
+    push = stack.append
+    pop = stack.pop
+    tree_append = tree_lines.append
+    files_append = files_to_render.append
+    suffix_of = _suffix
+    is_gitignored = _is_gitignored
+    max_file_size = MAX_FILE_SIZE
+
+    def push_entries(dir_path: str, rel_dir: str, depth: int, prefix: str, ignored: bool,
+                     gitignores: _GitignoreChain) -> None:
+        if tree_depth > 0 and depth >= tree_depth:
             return
         
-        for i, entry in enumerate(entries):
-            rel_path = entry.relative_to(cfg.root)
-            rel_posix = rel_path.as_posix()
+        if respect_gitignore and not ignored:
+            spec = get_gitignore_spec(dir_path)
+            if spec is not None:
+                gitignores += ((rel_dir, _compile_gitignore(spec)),)
+
+        # Sorted to ensure consistent order. Directories come first.
+        future = listings.pop(dir_path, None)
+        entries = scan_dir(dir_path) if future is None or future.cancel() else future.result()
+
+        # Pushed in reverse so that they are popped in order, and so that the
+        # first subdirectory is queued for listing last
+        prefetch_dirs = parallel_scan and (tree_depth <= 0 or depth + 1 < tree_depth)
+        last = len(entries) - 1
+        for i in range(last, -1, -1):
+            entry = entries[i]
+            push((entry, i == last, prefix, depth, ignored, gitignores))
+            if (prefetch_dirs and entry.is_dir(follow_symlinks=False)
+                    and entry.name not in exclude_dir_names and entry.name not in exclude_exact):
+                prefetch(entry.path)
 
-            # Ignore logic
-            is_ignored = False
-            if exclude_spec.match_file(rel_posix):
+    push_entries(root_str, "", 0, "", False, ())
+    while stack:
+        entry, is_last, prefix, depth, ignored, gitignores = pop()
+        rel_posix = entry.path[rel_start:]
+        if native_sep:
+            rel_posix = rel_posix.replace(native_sep, "/")
+        is_dir = entry.is_dir(follow_symlinks=False)
+
+        # Ignore logic
+        # Cheapest checks first: extension and name lookups, then the pathspecs.
+        # Directories are matched with a trailing slash, like git does, so
+        # patterns such as "build/" or "node_modules/**" prune the whole subtree.
+        is_ignored = ignored
+        if not is_ignored:
+            name = entry.name
+            suffix = "" if is_dir else suffix_of(name)
+            match_path = rel_posix + "/" if is_dir else rel_posix
+            if not is_dir and suffix.lower() in ignore_exts:
+                is_ignored = True
+            elif name in exclude_exact or name.endswith(exclude_suffixes):
+                is_ignored = True
+            elif is_dir and (name in exclude_dir_names or rel_posix in exclude_root_dirs):
+                is_ignored = True
+            elif is_excluded_name(name) or match_exclude(match_path):
                 is_ignored = True
-            if gitignore_spec and gitignore_spec.match_file(rel_posix):
+            elif gitignores and is_gitignored(gitignores, match_path):
                 is_ignored = True
-            if cfg.filters.include and not include_spec.match_file(rel_posix):
+            elif is_dir:
+                if prune_by_include and not may_hold_includes(rel_posix):
+                    is_ignored = True
+            elif has_include and not match_include(match_path):
                 # IF an include list exists, non-matching files are ignored
                 is_ignored = True
-            
-            # Tree Building
-            if cfg.include_tree:
-                is_last = i == len(entries) - 1
-                branch = "└── " if is_last else "├── "
-                label = entry.name + (" *" if is_ignored and entry.is_dir() else "")
-                tree_lines.append("".join(prefix_stack) + branch + label)
-
-            if is_ignored:
-                continue
+        
+        # Tree Building
+        if include_tree:
+            branch = "└── " if is_last else "├── "
+            label = entry.name + (" *" if is_ignored and is_dir else "")
+            tree_append(prefix + branch + label)
 
-            # Files and Directory Handling
-            if entry.is_dir():
-                if cfg.include_tree:
-                    prefix_stack.append("    " if is_last else "│   ")
-                walk(entry, depth + 1, prefix_stack)
-                if cfg.include_tree:
-                    prefix_stack.pop()
-            elif entry.is_file():
-                if entry.suffix in cfg.ignore_extensions:
+        if is_ignored:
+            if is_dir and walk_ignored:
+                push_entries(entry.path, rel_posix + "/", depth + 1, prefix + ("    " if is_last else "│   "),
+                             True, gitignores)
+            elif is_dir:
+                drop_prefetch(entry.path)
+            continue
+
+        # Files and Directory Handling
+        if is_dir:
+            push_entries(entry.path, rel_posix + "/", depth + 1, prefix + ("    " if is_last else "│   "),
+                         False, gitignores)
+        elif entry.is_file():
+            # Skip very large files (>10MB) without opening them
+            try:
+                st = entry.stat()
+            except (OSError, PermissionError):
+                continue
+            if st.st_size > max_file_size:
+                continue
+            if cache_path_str is not None:
+                if entry.path == cache_path_str:
                     continue
-                if not is_text_file(entry):
+                stat_key = (st.st_mtime_ns, st.st_size)
+                if known_skipped.get(rel_posix) == stat_key:
+                    skipped[rel_posix] = stat_key
                     continue
-                files_to_render.append(entry)
-
-    walk(cfg.root, 0, [])
+                file_stats[rel_posix] = stat_key
+            files_append((rel_posix, entry.path, suffix))
 
     # Writing output file
-    with cfg.output.open("w", encoding="utf-8", errors="replace") as out:
-        out.write(cfg.format.preamble.format(root=cfg.root.name))
-        out.write(f"\n\n# Flattened view of `{cfg.root.name}`\n\n")
+    # Files are read ahead on the pool so that their I/O overlaps with each
+    # other and with writing. Results come back in walk order, which is
+    # deterministic and matches the tree; the read-ahead window bounds how many
+    # file bodies are held in memory at once.
+    with pool, cfg.output.open("wb", buffering=1 << 20) as out:
+        out.write(cfg.format.preamble.format(root=cfg.root.name).encode("utf-8", errors="replace"))
+        out.write(f"\n\n# Flattened view of `{cfg.root.name}`\n\n".encode("utf-8", errors="replace"))
 
         if cfg.include_tree:
-            out.write("## Directory tree\n\n")
-            out.write("```\n")
-            out.write("\n".join(tree_lines))
-            out.write("\n```\n\n")
-            out.write("_Directories marked with '*' are ignored._\n\n")
+            out.write(b"## Directory tree\n\n")
+            out.write(b"```\n")
+            out.write("\n".join(tree_lines).encode("utf-8", errors="replace"))
+            out.write(b"\n```\n\n")
+            out.write(b"_Directories marked with '*' are ignored._\n\n")
 
-        out.write("## File Contents\n\n")
-        for p in sorted(files_to_render):
-            rel = p.relative_to(cfg.root)
-            heading = cfg.format.heading.format(path=rel.as_posix())
-            out.write(f"{heading}\n")
+        out.write(b"## File Contents\n\n")
+        fence_from_ext = cfg.format.fence_language_from_extension
+        heading_template = _heading_template(cfg.format.heading)
+        paths = [path for _, path, _ in files_to_render]
+        bodies = _map_ahead(pool, _read_body, paths, window=2 * workers)
+        for (rel_posix, _, suffix), (body, binary) in zip(files_to_render, bodies):
+            if body is None:
+                # Binary or unreadable; only the binary verdict is cached
+                if binary and cache_path is not None:
+                    skipped[rel_posix] = file_stats[rel_posix]
+                continue
 
-            lang = lang_from_suffix(p) if cfg.format.fence_language_from_extension else ""
-            out.write(f"```{lang}\n")
+            if heading_template is not None:
+                heading_prefix, heading_suffix = heading_template
+                heading = heading_prefix + rel_posix.encode("utf-8", errors="replace") + heading_suffix
+            else:
+                heading = f"{cfg.format.heading.format(path=rel_posix)}\n".encode("utf-8", errors="replace")
+            fence = _fence_open(suffix) if fence_from_ext else b"```\n"
+            # Heading, fences and body go out in a single write
+            out.write(b"".join((heading, fence, _strip_view(body), b"\n```\n\n")))
 
-            try:
-                content = p.read_text(encoding="utf-8", errors="ignore")
-                # Truncate very long files to prevent overwhelming the output.
-                if len(content) > 150000:   # 150k char limit
-                    content = content[:150000] + "\n\n... (file truncated)"
-                out.write(content.strip())
-            except (OSError, PermissionError):
-                out.write("(Error reading file)")
-            
-            out.write("\n```\n\n")
-                
-    
+    if cache_path is not None:
+        _save_skip_cache(cache_path, skipped)
@@ -1,30 +1,53 @@
 from __future__ import annotations
+import os
 from pathlib import Path
-from typing import Callable, Optional
+from typing import Callable, List, Optional, Tuple
 
 
-def build_ascii_tree(root: Path, max_depth: int = 0, is_dir_ignored: Optional[Callable[[Path], bool]] = None) -> str:
+def scan_dir(dir_path: str) -> List[os.DirEntry]:
+    """
+    List a directory with os.scandir, directories first, then by case-insensitive name.
+
+    Entry types come from the directory listing itself, so sorting costs no
+    stat calls. Symlinked directories sort with the files. Returns an empty
+    list if the directory cannot be read.
+    """
+    try:
+        with os.scandir(dir_path) as it:
+            return sorted(it, key=lambda e: (not e.is_dir(follow_symlinks=False), e.name.lower()))
+    except (OSError, PermissionError):
+        return []
+
+
+def build_ascii_tree(root: Path, max_depth: int = 0, is_dir_ignored: Optional[Callable[[str], bool]] = None) -> str:
+    """
+    Draw the directory tree under ``root``; ignored directories are marked with " *" and not descended.
+
+    ``is_dir_ignored`` receives the directory's path as a string.
+    """
     lines = [str(root)]
-    prefix_stack: list[str] = []
+    # Entries still to be drawn: (entry, is last in its directory, prefix, depth)
+    stack: List[Tuple[os.DirEntry, bool, str, int]] = []
 
-    def walk(dir_path: Path, depth: int):
+    def push_entries(dir_path: str, depth: int, prefix: str) -> None:
         if max_depth and depth > max_depth:
             return
-        try:
-            entries = sorted(dir_path.iterdir(), key=lambda p: (p.is_file(), p.name))
-        except PermissionError:
-            return
-        for i, entry in enumerate(entries):
-            is_last = i == len(entries) - 1
-            branch = "└── " if is_last else "├── "
-            ignored = entry.is_dir() and is_dir_ignored and is_dir_ignored(entry)
-            label = entry.name + (" *" if ignored else "")
-            lines.append("".join(prefix_stack) + branch + label)
-
-            if entry.is_dir() and not ignored:
-                prefix_stack.append("    " if is_last else "│   ")
-                walk(entry, depth + 1)
-                prefix_stack.pop()
-    
-    walk(root, 1)
-    return "\n".join(lines)
\ No newline at end of file
+        entries = scan_dir(dir_path)
+        # Pushed in reverse so that they are popped in order
+        last = len(entries) - 1
+        for i in range(last, -1, -1):
+            stack.append((entries[i], i == last, prefix, depth))
+
+    push_entries(str(root), 1, "")
+    while stack:
+        entry, is_last, prefix, depth = stack.pop()
+        branch = "└── " if is_last else "├── "
+        is_dir = entry.is_dir(follow_symlinks=False)
+        ignored = is_dir and is_dir_ignored is not None and is_dir_ignored(entry.path)
+        label = entry.name + (" *" if ignored else "")
+        lines.append(prefix + branch + label)
+
+        if is_dir and not ignored:
+            push_entries(entry.path, depth + 1, prefix + ("    " if is_last else "│   "))
+
+    return "\n".join(lines)